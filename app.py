@@ -1,12 +1,11 @@
 # app.py — AAVV el Pla · Biblioteca (Home + módulos)
+import time
+_t0 = time.perf_counter()  # medición de arranque (ver final del script)
+import json, os, tempfile, threading
 import streamlit as st
 import pandas as pd
-from datetime import date, timedelta
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from datetime import date, datetime, timedelta
+import historial
 
 # ---------- Config y estilo ----------
 st.set_page_config(page_title="AAVV el Pla - Biblioteca", page_icon="assets/logo.png", layout="wide")
@@ -43,31 +42,77 @@ def load_csv(path, cols):
     try: return pd.read_csv(path)
     except: return pd.DataFrame(columns=cols)
 
-def save_csv(df, path): df.to_csv(path, index=False)
-
-def df_to_pdf_bytes(title, df):
-    buf = BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=24, leftMargin=24, topMargin=24, bottomMargin=24)
-    styles = getSampleStyleSheet()
-    story = [Paragraph(title, styles["Title"]), Spacer(1,8)]
-    data = [list(df.columns)] + [[str(r.get(c,"")) for c in df.columns] for _, r in df.iterrows()]
-    t = Table(data, repeatRows=1)
-    t.setStyle(TableStyle([('BACKGROUND',(0,0),(-1,0),colors.lightgrey),
-                           ('GRID',(0,0),(-1,-1),0.25,colors.grey),
-                           ('FONT',(0,0),(-1,0),'Helvetica-Bold'),
-                           ('ROWBACKGROUNDS',(0,1),(-1,-1),[colors.whitesmoke,colors.white])]))
-    story.append(t); doc.build(story); buf.seek(0); return buf
-
-def export_section(title, df):
-    c1, c2 = st.columns(2)
-    c1.download_button("⬇️ CSV", df.to_csv(index=False), file_name=f"{title.lower().replace(' ','_')}.csv")
-    c2.download_button("🖨️ PDF", data=df_to_pdf_bytes(title, df),
-                       file_name=f"{title.lower().replace(' ','_')}.pdf", mime="application/pdf")
-
-# ---------- Carga inicial ----------
-libros    = load_csv("libros.csv", LIBROS_COLS)
-usuarios  = load_csv("usuarios.csv", USUARIOS_COLS)
-prestamos = load_csv("prestamos.csv", PRESTAMOS_COLS)
+def save_csv(df, path): df.to_csv(path, index=False); _guardar_meta(path, df)
+
+# Metadatos baratos (nº de filas, vencimientos por día) para Inicio, sin parsear los CSV
+META_PATH = "tablas_meta.json"
+
+def _resumen(df):
+    r = {"filas": len(df)}
+    if "Fecha de devolución" in df.columns:
+        f = pd.to_datetime(df["Fecha de devolución"], errors="coerce").dropna().dt.strftime("%Y-%m-%d")
+        r["vencimientos"] = {k:int(v) for k,v in f.value_counts().items()}
+    return r
+
+def _leer_meta():
+    try:
+        with open(META_PATH, encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def _guardar_meta(path, df):
+    meta = _leer_meta()
+    meta[path] = {"mtime": os.path.getmtime(path), **_resumen(df)}
+    # temporal con nombre único: las sesiones guardan en hilos distintos a la vez
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(META_PATH) or ".", delete=False) as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(f.name, META_PATH)
+
+def resumen_csv(path, cols):
+    # Solo se parsea el CSV si ha cambiado desde el último save_csv (o se editó a mano)
+    if not os.path.exists(path): return _resumen(pd.DataFrame(columns=cols))
+    r = _leer_meta().get(path)
+    if r and r.get("mtime")==os.path.getmtime(path): return r
+    _guardar_meta(path, load_csv(path, cols)); return _leer_meta()[path]
+
+# Índices de historial (Id_usuario / ISBN -> filas de prestamos), compartidos entre sesiones
+# El lock cubre comprobación de versión/reconstrucción, consultas y save+op: si otra sesión
+# reconstruyera entre el save_csv y la op, el cambio se aplicaría dos veces.
+@st.cache_resource
+def _indice(): return {"version": None, "lock": threading.RLock()}
+
+def _version_csv(path): return os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+
+def _al_dia(h):
+    v = _version_csv("prestamos.csv")
+    if h["version"] != v:  # primera vez o CSV modificado fuera de esta app: se reconstruye
+        h.update(historial.construir(load_csv("prestamos.csv", PRESTAMOS_COLS), v))
+    return h
+
+def consultar_historial(fn, clave):
+    h = _indice()
+    with h["lock"]: return fn(_al_dia(h), clave)
+
+def guardar_prestamos(op, *args):
+    # save_csv de prestamos + mantenimiento incremental de los índices (op de historial).
+    # La op solo vale si esta sesión cargó la misma versión que indexa h; si otra sesión
+    # guardó entretanto, se reconstruye a partir de lo que se acaba de escribir.
+    h = _indice()
+    with h["lock"]:
+        _al_dia(h); previa = h["version"]
+        save_csv(prestamos, "prestamos.csv"); v = _version_csv("prestamos.csv")
+        if previa == prestamos_version: op(h, *args, prestamos.copy(), v)
+        else: h.update(historial.construir(prestamos.copy(), v))
+
+def _panel_exportar():
+    import panel_exportar  # motor de exportación: solo se carga al pedir una exportación
+    return panel_exportar
+
+def export_section(title, df): _panel_exportar().export_section(title, df)
+
+# ---------- Carga diferida ----------
+# Cada página carga en el router solo las tablas que usa; Inicio no carga ninguna.
+libros = usuarios = prestamos = None
+prestamos_version = None  # versión de prestamos.csv cargada en esta ejecución (ver guardar_prestamos)
 
 # ---------- Estado y router ----------
 st.session_state.setdefault("page", "Inicio")
@@ -78,19 +123,19 @@ st.session_state.setdefault("trigger_export", False)
 
 def go(dest): st.session_state["page"] = dest
 
+def abrir_ficha(dest, clave, valor):
+    st.session_state[clave] = valor; go(dest)
+
 # ---------- Home ----------
-def home_screen(libros_df, usuarios_df, prestamos_df):
+def home_screen():
     st.subheader("🏠 Inicio")
     c1, c2, c3 = st.columns(3)
-    with c1: st.metric("Libros", len(libros_df))
-    with c2: st.metric("Usuarios", len(usuarios_df))
+    with c1: st.metric("Libros", resumen_csv("libros.csv", LIBROS_COLS)["filas"])
+    with c2: st.metric("Usuarios", resumen_csv("usuarios.csv", USUARIOS_COLS)["filas"])
     with c3:
-        v = 0
-        if not prestamos_df.empty:
-            df = prestamos_df.copy()
-            df["Fecha de devolución"] = pd.to_datetime(df["Fecha de devolución"], errors="coerce")
-            v = int((df["Fecha de devolución"].dropna() < pd.Timestamp.today()).sum())
-        st.metric("Préstamos (vencidos)", v)
+        hoy = date.today().isoformat()
+        venc = resumen_csv("prestamos.csv", PRESTAMOS_COLS).get("vencimientos", {})
+        st.metric("Préstamos (vencidos)", sum(n for d, n in venc.items() if d <= hoy))
 
     st.markdown('<div class="home-grid">', unsafe_allow_html=True)
     col1, col2, col3 = st.columns(3)
@@ -120,6 +165,7 @@ st.markdown("---")
 
 # ---------- Acciones inferiores ----------
 def acciones_inferiores(modulo):
+    if st.session_state.get("exportaciones"): _panel_exportar().panel_exportaciones()
     st.markdown('<div class="page-spacer"></div>', unsafe_allow_html=True)
     st.markdown('<div class="bottom-bar"><div class="bar-grid">', unsafe_allow_html=True)
     c1,c2,c3,c4,c5,c6 = st.columns(6)
@@ -156,6 +202,10 @@ def render_libros():
         if f2: df=df[df["Autor"].str.contains(f2,case=False,na=False)]
         if f3: df=df[df["Categoría"].str.contains(f3,case=False,na=False)]
         st.dataframe(df, use_container_width=True)
+        if not df.empty:
+            c1,c2=st.columns([3,1]); titulos=dict(zip(df["ISBN"], df["Título"]))
+            isbn=c1.selectbox("Ver ficha del libro", list(titulos), format_func=lambda i: f"{i} — {titulos[i]}")
+            c2.button("📘 Ver ficha", use_container_width=True, on_click=abrir_ficha, args=("Ficha libro","ficha_isbn",isbn))
         if st.session_state.get("trigger_export", False):
             export_section("Libros", df); st.session_state["trigger_export"]=False
 
@@ -213,6 +263,10 @@ def render_usuarios():
         if f2: df=df[df["Teléfono"].astype(str).str.contains(f2,na=False)]
         if f3: df=df[df["Correo electrónico"].str.contains(f3,case=False,na=False)]
         st.dataframe(df, use_container_width=True)
+        if not df.empty:
+            c1,c2=st.columns([3,1]); nombres=dict(zip(df["Id_usuario"].astype(int), df["Nombre o mote"].astype(str)+" "+df["Apellidos"].fillna("").astype(str)))
+            uid=c1.selectbox("Ver ficha del lector", list(nombres), format_func=lambda i: f"{i} — {nombres[i]}")
+            c2.button("👤 Ver ficha", use_container_width=True, on_click=abrir_ficha, args=("Ficha lector","ficha_usuario",uid))
         if st.session_state.get("trigger_export", False):
             export_section("Usuarios", df); st.session_state["trigger_export"]=False
 
@@ -328,7 +382,7 @@ def render_prestamos():
                 else:
                     row={"ISBN":isbn,"Id_usuario":uid,"Fecha del préstamo":f_p,"Fecha de devolución":f_dev,
                          "Fecha de devolución real":"","Estado en que se devuelve":"","Fuera de plazo":False,"Notas":notas}
-                    prestamos=pd.concat([prestamos,pd.DataFrame([row])], ignore_index=True); save_csv(prestamos,"prestamos.csv"); st.success("Préstamo creado.")
+                    prestamos=pd.concat([prestamos,pd.DataFrame([row])], ignore_index=True); guardar_prestamos(historial.alta); st.success("Préstamo creado.")
 
     elif accion=="Modificar":
         if prestamos.empty: st.info("No hay préstamos.")
@@ -345,14 +399,14 @@ def render_prestamos():
                 notas=st.text_area("Notas", value=r.get("Notas",""))
                 if st.form_submit_button("Guardar cambios"):
                     prestamos.loc[idx, ["ISBN","Id_usuario","Fecha del préstamo","Fecha de devolución","Notas"]] = [isbn,uid,f_p,f_dev,notas]
-                    save_csv(prestamos,"prestamos.csv"); st.success("Préstamo actualizado.")
+                    guardar_prestamos(historial.modificar, int(idx)); st.success("Préstamo actualizado.")
 
     elif accion=="Baja":
         if prestamos.empty: st.info("No hay préstamos.")
         else:
             idx=st.number_input("Índice de fila a eliminar", min_value=0, max_value=len(prestamos)-1, value=0)
             if st.button("Eliminar préstamo"):
-                prestamos=prestamos.drop(prestamos.index[idx]).reset_index(drop=True); save_csv(prestamos,"prestamos.csv"); st.success("Préstamo eliminado.")
+                prestamos=prestamos.drop(prestamos.index[idx]).reset_index(drop=True); guardar_prestamos(historial.baja, int(idx)); st.success("Préstamo eliminado.")
 
     elif accion=="Registrar devolución":
         if prestamos.empty: st.info("No hay préstamos.")
@@ -367,7 +421,7 @@ def render_prestamos():
                     f_prev = pd.to_datetime(r["Fecha de devolución"]).date() if pd.notna(r["Fecha de devolución"]) else (pd.to_datetime(r["Fecha del préstamo"]).date()+timedelta(days=30))
                     fuera = f_real > f_prev
                     prestamos.loc[idx, ["Fecha de devolución real","Estado en que se devuelve","Fuera de plazo","Notas"]] = [f_real, estado_dev, fuera, notas]
-                    save_csv(prestamos,"prestamos.csv")
+                    guardar_prestamos(historial.actualizar)
                     # actualizar estado del libro si empeora
                     libro_row = libros[libros["ISBN"]==r["ISBN"]]
                     order = ["Nuevo","Muy bueno","Bueno","Aceptable","Dañado","Perdido"]
@@ -379,12 +433,98 @@ def render_prestamos():
                     st.success("Devolución registrada y estado verificado/actualizado.")
     acciones_inferiores("Préstamos")
 
+# ---------- Fichas: lector y libro ----------
+ESTADOS = ["Nuevo","Muy bueno","Bueno","Aceptable","Dañado","Perdido"]
+
+def _con_fechas(df):
+    df = df.copy()
+    for c in ["Fecha del préstamo","Fecha de devolución","Fecha de devolución real"]:
+        df[c] = pd.to_datetime(df[c], errors="coerce")
+    return df
+
+def render_ficha_usuario():
+    uid = st.session_state.get("ficha_usuario")
+    u = usuarios[usuarios["Id_usuario"]==uid]
+    nombre = f"{u.iloc[0]['Nombre o mote']} {u.iloc[0]['Apellidos'] if pd.notna(u.iloc[0]['Apellidos']) else ''}" if not u.empty else "(usuario eliminado)"
+    st.subheader(f"👤 Ficha de lector · {nombre} (Id {uid})")
+    df = _con_fechas(consultar_historial(historial.filas_usuario, uid))
+    titulos = dict(zip(libros["ISBN"].astype(str), libros["Título"]))
+    df.insert(1, "Título", df["ISBN"].astype(str).map(titulos))
+    actuales = df[df["Fecha de devolución real"].isna()]
+    pasados  = df[df["Fecha de devolución real"].notna()].sort_values("Fecha de devolución real", ascending=False)
+    c1,c2,c3 = st.columns(3)
+    c1.metric("Préstamos actuales", len(actuales))
+    c2.metric("Préstamos pasados", len(pasados))
+    c3.metric("Devoluciones fuera de plazo", int((pasados["Fecha de devolución real"] > pasados["Fecha de devolución"]).sum()))
+    st.markdown("**Préstamos actuales**")
+    if actuales.empty: st.info("Sin préstamos en curso.")
+    else: st.dataframe(actuales.drop(columns=["Id_usuario","Fecha de devolución real","Estado en que se devuelve"]), use_container_width=True)
+    st.markdown("**Historial**")
+    if pasados.empty: st.info("Sin préstamos devueltos.")
+    else: st.dataframe(pasados.drop(columns=["Id_usuario"]), use_container_width=True)
+    st.button("⬅️ Volver a Usuarios", on_click=go, args=("Usuarios",))
+
+def render_ficha_libro():
+    isbn = st.session_state.get("ficha_isbn")
+    l = libros[libros["ISBN"].astype(str)==str(isbn)]
+    st.subheader(f"📘 Ficha de libro · {l.iloc[0]['Título'] if not l.empty else '(libro eliminado)'} (ISBN {isbn})")
+    df = _con_fechas(consultar_historial(historial.filas_isbn, isbn))
+    nombres = dict(zip(usuarios["Id_usuario"].astype(int), usuarios["Nombre o mote"]))
+    df.insert(2, "Lector", df["Id_usuario"].map(lambda v: nombres.get(int(v)) if pd.notna(v) else None))
+    actuales = df[df["Fecha de devolución real"].isna()]
+    pasados  = df[df["Fecha de devolución real"].notna()].sort_values("Fecha de devolución real")
+    c1,c2,c3 = st.columns(3)
+    c1.metric("Estado actual", l.iloc[0]["Estado de conservación"] if not l.empty else "—")
+    c2.metric("Prestados ahora", f"{len(actuales)} / {int(l.iloc[0]['Número de ejemplares'])}" if not l.empty else len(actuales))
+    c3.metric("Préstamos totales", len(df))
+    st.markdown("**Quién lo tiene**")
+    if actuales.empty: st.info("Ningún ejemplar prestado.")
+    else: st.dataframe(actuales[["Id_usuario","Lector","Fecha del préstamo","Fecha de devolución","Notas"]], use_container_width=True)
+    st.markdown("**Evolución del estado** (0 = Nuevo … 5 = Perdido)")
+    tendencia = pasados[pasados["Estado en que se devuelve"].isin(ESTADOS)]
+    if tendencia.empty: st.info("Sin devoluciones con estado registrado.")
+    else: st.line_chart(pd.Series(tendencia["Estado en que se devuelve"].map(ESTADOS.index).to_numpy(),
+                                  index=tendencia["Fecha de devolución real"], name="Estado"))
+    st.markdown("**Historial**")
+    if pasados.empty: st.info("Sin préstamos devueltos.")
+    else: st.dataframe(pasados.drop(columns=["ISBN"]).iloc[::-1], use_container_width=True)
+    st.button("⬅️ Volver a Libros", on_click=go, args=("Libros",))
+
 # ---------- Router ----------
 if st.session_state["page"] == "Inicio":
-    home_screen(libros, usuarios, prestamos)
+    home_screen()
 elif st.session_state["page"] == "Libros":
+    libros = load_csv("libros.csv", LIBROS_COLS)
     render_libros()
 elif st.session_state["page"] == "Usuarios":
+    usuarios = load_csv("usuarios.csv", USUARIOS_COLS)
     render_usuarios()
 elif st.session_state["page"] == "Préstamos":
+    libros    = load_csv("libros.csv", LIBROS_COLS)
+    usuarios  = load_csv("usuarios.csv", USUARIOS_COLS)
+    prestamos_version = _version_csv("prestamos.csv")  # antes de leer: si cambia entre medias, se reconstruye
+    prestamos = load_csv("prestamos.csv", PRESTAMOS_COLS)
     render_prestamos()
+elif st.session_state["page"] == "Ficha lector":
+    libros    = load_csv("libros.csv", LIBROS_COLS)
+    usuarios  = load_csv("usuarios.csv", USUARIOS_COLS)
+    render_ficha_usuario()
+elif st.session_state["page"] == "Ficha libro":
+    libros    = load_csv("libros.csv", LIBROS_COLS)
+    usuarios  = load_csv("usuarios.csv", USUARIOS_COLS)
+    render_ficha_libro()
+
+# ---------- Tiempo de arranque ----------
+# Se registra la primera ejecución de cada sesión (first paint); "en_frio" marca la
+# primera tras reiniciar el servidor, que es la que paga los imports.
+@st.cache_resource
+def _servidor(): return {"en_frio": True}
+
+if not st.session_state.get("arranque_medido"):
+    st.session_state["arranque_medido"] = True
+    srv = _servidor(); en_frio = srv["en_frio"]; srv["en_frio"] = False
+    ms = (time.perf_counter() - _t0) * 1000
+    nuevo = not os.path.exists("tiempos_arranque.csv")
+    with open("tiempos_arranque.csv", "a", encoding="utf-8") as f:
+        if nuevo: f.write("Fecha,Página,ms,en_frio\n")
+        f.write(f"{datetime.now().isoformat(timespec='seconds')},{st.session_state['page']},{ms:.1f},{en_frio}\n")
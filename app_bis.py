@@ -1,12 +1,9 @@
 # app.py — AAVV el Pla · Biblioteca (Home + módulos)
+import os
 import streamlit as st
 import pandas as pd
 from datetime import date, timedelta
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from panel_exportar import export_section, panel_exportaciones
 
 # ---------- Config y estilo ----------
 st.set_page_config(page_title="AAVV el Pla - Biblioteca", page_icon="assets/logo.png", layout="wide")
@@ -45,25 +42,6 @@ def load_csv(path, cols):
 
 def save_csv(df, path): df.to_csv(path, index=False)
 
-def df_to_pdf_bytes(title, df):
-    buf = BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=24, leftMargin=24, topMargin=24, bottomMargin=24)
-    styles = getSampleStyleSheet()
-    story = [Paragraph(title, styles["Title"]), Spacer(1,8)]
-    data = [list(df.columns)] + [[str(r.get(c,"")) for c in df.columns] for _, r in df.iterrows()]
-    t = Table(data, repeatRows=1)
-    t.setStyle(TableStyle([('BACKGROUND',(0,0),(-1,0),colors.lightgrey),
-                           ('GRID',(0,0),(-1,-1),0.25,colors.grey),
-                           ('FONT',(0,0),(-1,0),'Helvetica-Bold'),
-                           ('ROWBACKGROUNDS',(0,1),(-1,-1),[colors.whitesmoke,colors.white])]))
-    story.append(t); doc.build(story); buf.seek(0); return buf
-
-def export_section(title, df):
-    c1, c2 = st.columns(2)
-    c1.download_button("⬇️ CSV", df.to_csv(index=False), file_name=f"{title.lower().replace(' ','_')}.csv")
-    c2.download_button("🖨️ PDF", data=df_to_pdf_bytes(title, df),
-                       file_name=f"{title.lower().replace(' ','_')}.pdf", mime="application/pdf")
-
 # ---------- Carga inicial ----------
 libros    = load_csv("libros.csv", LIBROS_COLS)
 usuarios  = load_csv("usuarios.csv", USUARIOS_COLS)
@@ -120,6 +98,7 @@ st.markdown("---")
 
 # ---------- Acciones inferiores ----------
 def acciones_inferiores(modulo):
+    panel_exportaciones()
     st.markdown('<div class="page-spacer"></div>', unsafe_allow_html=True)
     st.markdown('<div class="bottom-bar"><div class="bar-grid">', unsafe_allow_html=True)
     c1,c2,c3,c4,c5,c6 = st.columns(6)
@@ -252,6 +231,18 @@ def render_usuarios():
     acciones_inferiores("Usuarios")
 
 # ---------- Módulo: Préstamos ----------
+FILAS_POR_PAGINA = 50
+ESTILO_VENCIDO = "background-color:#ffd6d6"
+
+@st.cache_data(max_entries=64)
+def _pagina_prestamos(_df, version, pagina):
+    # Solo se estiliza la página visible; la máscara de vencidos se calcula de una vez
+    # (sin función por fila). _df no se hashea: la clave es la versión de datos + página.
+    pag = _df.iloc[pagina*FILAS_POR_PAGINA:(pagina+1)*FILAS_POR_PAGINA]
+    estilos = pd.DataFrame("", index=pag.index, columns=pag.columns)
+    estilos.loc[pag["Fuera de plazo"].fillna(False).astype(bool).to_numpy(), :] = ESTILO_VENCIDO
+    return pag, estilos
+
 def render_prestamos():
     global prestamos, libros, usuarios
     st.subheader("🔁 Préstamos")
@@ -265,11 +256,8 @@ def render_prestamos():
         prestamos["Fecha de devolución"]     = pd.to_datetime(prestamos["Fecha de devolución"], errors="coerce")
         prestamos["Fecha de devolución real"]= pd.to_datetime(prestamos["Fecha de devolución real"], errors="coerce")
         hoy = pd.to_datetime(date.today())
-        prestamos["Fuera de plazo"] = prestamos.apply(
-            lambda r: (pd.isna(r["Fecha de devolución real"]) and pd.notna(r["Fecha de devolución"]) and hoy > r["Fecha de devolución"]) or
-                      (pd.notna(r["Fecha de devolución real"]) and pd.notna(r["Fecha de devolución"]) and r["Fecha de devolución real"] > r["Fecha de devolución"]),
-            axis=1
-        )
+        real, prev = prestamos["Fecha de devolución real"], prestamos["Fecha de devolución"]
+        prestamos["Fuera de plazo"] = (real.isna() & prev.notna() & (hoy > prev)) | (real.notna() & prev.notna() & (real > prev))
 
     if accion=="Consultar":
         c1,c2=st.columns(2); modo=c1.selectbox("Filtrar por fecha de préstamo", ["Todos","Antes de","En","Después de"]); fref=c2.date_input("Fecha de referencia", value=date.today())
@@ -278,8 +266,13 @@ def render_prestamos():
             if modo=="Antes de": df=df[df["Fecha del préstamo"]<pd.to_datetime(fref)]
             elif modo=="En": df=df[df["Fecha del préstamo"]==pd.to_datetime(fref)]
             elif modo=="Después de": df=df[df["Fecha del préstamo"]>pd.to_datetime(fref)]
-            st.dataframe(df.style.apply(lambda s: ["background-color:#ffd6d6" if (v==True) else "" for v in s["Fuera de plazo"]], axis=1),
-                        use_container_width=True)
+            version = (os.stat("prestamos.csv").st_mtime_ns if os.path.exists("prestamos.csv") else 0, date.today(), modo, fref)
+            n_pag = max(1, -(-len(df)//FILAS_POR_PAGINA))
+            c1,c2=st.columns(2)
+            pagina=c1.number_input(f"Página (de {n_pag})", min_value=1, max_value=n_pag, value=1)
+            c2.caption(f"{len(df)} préstamos · {int(df['Fuera de plazo'].sum())} fuera de plazo")
+            pag, estilos = _pagina_prestamos(df, version, int(pagina)-1)
+            st.dataframe(pag.style.apply(lambda _: estilos, axis=None), use_container_width=True)
             if st.session_state.get("trigger_export", False):
                 export_section("Préstamos", df); st.session_state["trigger_export"]=False
         else:
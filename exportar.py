@@ -0,0 +1,117 @@
+# exportar.py — AAVV el Pla · Biblioteca (motor de exportación PDF)
+# Los PDF se generan en un pool de procesos para no bloquear la sesión de Streamlit
+# ni competir por el GIL. Cada trabajo deja su progreso y su resultado en disco.
+import hashlib, os, tempfile, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from multiprocessing import get_context
+
+EXPORT_DIR = "exportaciones"
+EXPORT_TTL = 24*3600      # segundos que se conserva un PDF terminado
+FILAS_POR_PAGINA = 40     # estimación para la barra de progreso
+
+_pool = None
+_trabajos = {}            # job_id -> Future (solo en el proceso del servidor)
+_lock = threading.Lock()  # las sesiones de Streamlit llaman desde hilos distintos
+
+# ---------- Generación ----------
+def df_to_pdf_bytes(title, df, on_progress=None):
+    # reportlab solo se importa aquí: el servidor nunca lo carga, solo los trabajadores
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+    buf = BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=24, leftMargin=24, topMargin=24, bottomMargin=24)
+    if on_progress:
+        paginas = max(1, -(-len(df)//FILAS_POR_PAGINA))
+        doc.setProgressCallBack(lambda typ, v: on_progress(min(v/paginas, 0.99)) if typ=="PAGE" else None)
+    styles = getSampleStyleSheet()
+    story = [Paragraph(title, styles["Title"]), Spacer(1,8)]
+    data = [list(df.columns)] + [[str(r.get(c,"")) for c in df.columns] for _, r in df.iterrows()]
+    t = Table(data, repeatRows=1)
+    t.setStyle(TableStyle([('BACKGROUND',(0,0),(-1,0),colors.lightgrey),
+                           ('GRID',(0,0),(-1,-1),0.25,colors.grey),
+                           ('FONT',(0,0),(-1,0),'Helvetica-Bold'),
+                           ('ROWBACKGROUNDS',(0,1),(-1,-1),[colors.whitesmoke,colors.white])]))
+    story.append(t); doc.build(story); buf.seek(0); return buf
+
+def _ruta(job_id, ext="pdf"): return os.path.join(EXPORT_DIR, f"{job_id}.{ext}")
+
+def _temporal(job_id, modo):
+    # nombre único con el job_id como prefijo (purgar() lo reconoce por él)
+    return tempfile.NamedTemporaryFile(modo, dir=EXPORT_DIR, prefix=f"{job_id}.", suffix=".tmp", delete=False)
+
+def _escribir_progreso(job_id, valor):
+    with _temporal(job_id, "w") as f: f.write(f"{valor:.3f}")
+    os.replace(f.name, _ruta(job_id, "progress"))
+
+def _generar_pdf(job_id, title, df):
+    # Se ejecuta en el proceso trabajador: escribe a un temporal y lo renombra al terminar
+    _escribir_progreso(job_id, 0.0)
+    buf = df_to_pdf_bytes(title, df, on_progress=lambda p: _escribir_progreso(job_id, p))
+    with _temporal(job_id, "wb") as f: f.write(buf.getvalue())
+    os.replace(f.name, _ruta(job_id))
+    try: os.remove(_ruta(job_id, "progress"))
+    except OSError: pass
+    return _ruta(job_id)
+
+# ---------- Trabajos ----------
+def _get_pool():
+    # llamar con _lock tomado
+    global _pool
+    if _pool is None:
+        # spawn: no heredar los hilos del servidor de Streamlit en el hijo
+        _pool = ProcessPoolExecutor(max_workers=max(1, min(2, (os.cpu_count() or 1)-1)), mp_context=get_context("spawn"))
+    return _pool
+
+def purgar():
+    with _lock: _purgar()
+
+def _purgar():
+    if not os.path.isdir(EXPORT_DIR): return
+    limite = time.time() - EXPORT_TTL
+    for nombre in os.listdir(EXPORT_DIR):
+        ruta = os.path.join(EXPORT_DIR, nombre)
+        job_id = nombre.split(".")[0]
+        if job_id in _trabajos and not _trabajos[job_id].done(): continue
+        try:
+            if os.path.getmtime(ruta) < limite: os.remove(ruta)
+        except OSError: pass
+    for job_id in [j for j, fut in _trabajos.items() if fut.done() and not os.path.exists(_ruta(j))]:
+        _trabajos.pop(job_id, None)
+
+def lanzar(title, df):
+    """Encola la generación del PDF y devuelve su job_id. Si ya existe el mismo
+    PDF (mismo título y mismos datos) en disco o en curso, se reutiliza."""
+    global _pool
+    firma = hashlib.sha1((title + "\n" + df.to_csv(index=False)).encode("utf-8")).hexdigest()[:16]
+    job_id = f"{title.lower().replace(' ','_')}_{firma}"
+    with _lock:
+        os.makedirs(EXPORT_DIR, exist_ok=True); _purgar()
+        if os.path.exists(_ruta(job_id)):
+            try: os.utime(_ruta(job_id))  # renueva la caducidad
+            except OSError: pass
+            return job_id
+        fut = _trabajos.get(job_id)
+        if fut is None or fut.done():
+            try: _trabajos[job_id] = _get_pool().submit(_generar_pdf, job_id, title, df)
+            except BrokenProcessPool:
+                # un trabajador murió (p. ej. sin memoria): se cierra el pool roto y se reintenta
+                _pool.shutdown(wait=False); _pool = None
+                _trabajos[job_id] = _get_pool().submit(_generar_pdf, job_id, title, df)
+    return job_id
+
+def estado(job_id):
+    """Devuelve (estado, progreso, detalle) con estado en "listo", "en curso",
+    "error" o None si el trabajo ya no existe (caducado o servidor reiniciado)."""
+    if os.path.exists(_ruta(job_id)): return "listo", 1.0, _ruta(job_id)
+    fut = _trabajos.get(job_id)
+    if fut is None: return None, 0.0, None
+    if fut.done():
+        return ("error", 0.0, str(fut.exception())) if fut.exception() is not None else (None, 0.0, None)
+    try:
+        with open(_ruta(job_id, "progress")) as f: p = float(f.read() or 0)
+    except (OSError, ValueError): p = 0.0
+    return "en curso", p, None
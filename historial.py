@@ -0,0 +1,56 @@
+# historial.py — AAVV el Pla · Biblioteca (índices de préstamos)
+# Índices secundarios Id_usuario -> filas e ISBN -> filas de prestamos para las fichas
+# de lector y de libro, sin recorrer toda la tabla. Las filas son posiciones (iloc),
+# igual que los índices de fila que usan Modificar/Baja en Préstamos.
+
+def _uid(v):
+    try: return int(v)
+    except (TypeError, ValueError): return None
+
+def _isbn(v): return None if v is None or v!=v else str(v)
+
+def _añadir(indice, clave, pos):
+    if clave is not None: indice.setdefault(clave, []).append(pos)
+
+def _quitar(indice, clave, pos):
+    filas = indice.get(clave, [])
+    if pos in filas: filas.remove(pos)
+    if not filas: indice.pop(clave, None)
+
+def construir(df, version):
+    h = {"version":version, "df":df, "usuario":{}, "isbn":{}}
+    for pos, (isbn, uid) in enumerate(zip(df["ISBN"], df["Id_usuario"])):
+        _añadir(h["usuario"], _uid(uid), pos); _añadir(h["isbn"], _isbn(isbn), pos)
+    return h
+
+# ---------- Mantenimiento (df = prestamos ya modificado) ----------
+def alta(h, df, version):
+    pos = len(df)-1
+    _añadir(h["usuario"], _uid(df["Id_usuario"].iloc[pos]), pos); _añadir(h["isbn"], _isbn(df["ISBN"].iloc[pos]), pos)
+    h["df"], h["version"] = df, version
+
+def baja(h, pos, df, version):
+    viejo = h["df"].iloc[pos]
+    _quitar(h["usuario"], _uid(viejo["Id_usuario"]), pos); _quitar(h["isbn"], _isbn(viejo["ISBN"]), pos)
+    for indice in (h["usuario"], h["isbn"]):  # las filas posteriores suben una posición
+        for filas in indice.values(): filas[:] = [p-1 if p>pos else p for p in filas]
+    h["df"], h["version"] = df, version
+
+def modificar(h, pos, df, version):
+    viejo, nuevo = h["df"].iloc[pos], df.iloc[pos]
+    if _uid(viejo["Id_usuario"]) != _uid(nuevo["Id_usuario"]):
+        _quitar(h["usuario"], _uid(viejo["Id_usuario"]), pos); _añadir(h["usuario"], _uid(nuevo["Id_usuario"]), pos)
+        h["usuario"].get(_uid(nuevo["Id_usuario"]), []).sort()
+    if _isbn(viejo["ISBN"]) != _isbn(nuevo["ISBN"]):
+        _quitar(h["isbn"], _isbn(viejo["ISBN"]), pos); _añadir(h["isbn"], _isbn(nuevo["ISBN"]), pos)
+        h["isbn"].get(_isbn(nuevo["ISBN"]), []).sort()
+    h["df"], h["version"] = df, version
+
+def actualizar(h, df, version):
+    # Cambios que no tocan ISBN ni Id_usuario (p. ej. registrar una devolución)
+    h["df"], h["version"] = df, version
+
+# ---------- Consultas ----------
+def filas_usuario(h, uid): return h["df"].iloc[h["usuario"].get(_uid(uid), [])]
+
+def filas_isbn(h, isbn): return h["df"].iloc[h["isbn"].get(_isbn(isbn), [])]
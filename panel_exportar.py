@@ -0,0 +1,48 @@
+# panel_exportar.py — AAVV el Pla · Biblioteca (panel de Exportaciones)
+# UI compartida por app.py y app_bis.py. Va aparte de exportar.py para que los
+# procesos trabajadores del pool no importen Streamlit.
+import streamlit as st
+import exportar
+
+MAX_EXPORTACIONES = 3   # entradas que se conservan en el panel (las más antiguas se descartan)
+
+def export_section(title, df):
+    # El CSV y el PDF quedan en el panel de Exportaciones hasta que el usuario los descarta;
+    # el PDF se encola en el pool y se sigue en panel_exportaciones()
+    job_id = exportar.lanzar(title, df)
+    trabajos = [t for t in st.session_state.get("exportaciones", []) if t["id"]!=job_id]
+    trabajos.append({"id":job_id, "titulo":title, "nombre":title.lower().replace(' ','_'), "csv":df.to_csv(index=False)})
+    st.session_state["exportaciones"] = trabajos[-MAX_EXPORTACIONES:]
+
+def _descartar_exportacion(job_id):
+    st.session_state["exportaciones"] = [t for t in st.session_state.get("exportaciones", []) if t["id"]!=job_id]
+
+@st.fragment(run_every=1)
+def _progreso(job_id, titulo):
+    # Solo se refresca la barra de un PDF en curso; al terminar, rerun completo para
+    # dibujar su descarga en la ejecución normal (no en cada tick)
+    est, prog, _ = exportar.estado(job_id)
+    if est!="en curso": st.rerun()
+    st.progress(prog, text=f"🖨️ {titulo}: generando PDF…")
+
+def panel_exportaciones():
+    trabajos = st.session_state.get("exportaciones", [])
+    if not trabajos: return
+    st.markdown("**Exportaciones**")
+    for t in list(trabajos):
+        est, prog, detalle = exportar.estado(t["id"])
+        c1, c2, c3 = st.columns([2,3,1])
+        c1.download_button(f"⬇️ CSV {t['titulo']}", t["csv"], file_name=f"{t['nombre']}.csv", key=f"csv_{t['id']}")
+        with c2:
+            if est=="en curso": _progreso(t["id"], t["titulo"])
+            elif est=="error": st.error(f"No se pudo generar el PDF de {t['titulo']}: {detalle}")
+            else:
+                pdf = None
+                if est=="listo":
+                    try:
+                        with open(detalle, "rb") as f: pdf = f.read()
+                    except OSError: pass  # purgado por otra sesión justo después de estado()
+                if pdf is None: st.caption("PDF caducado: vuelve a exportar para generarlo.")
+                else: st.download_button(f"🖨️ PDF {t['titulo']}", data=pdf, file_name=f"{t['nombre']}.pdf",
+                                         mime="application/pdf", key=f"dl_{t['id']}")
+        c3.button("✖️", key=f"x_{t['id']}", help="Descartar", on_click=_descartar_exportacion, args=(t["id"],))